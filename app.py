@@ -62,19 +62,15 @@ def discover_violations(directory,output):
     header = [['STUDENT', 'AIRPLANE', 'INSTRUCTOR', 'TAKEOFF', 'LANDING', 'FILED', 'AREA', 'REASON']]
     output_data = header + vios
 
-    if len(vios) == 1:
-        out_line = str(repr(num_vios)+' violation found.')
-    elif len(vios) > 1:
-        out_line = str(repr(num_vios)+' violations found.')
-    elif len(vios) == 0:
+    if num_vios == 0:
         out_line = 'No violations found.'
+    elif num_vios == 1:
+        out_line = '1 violation found.'
+    else:
+        out_line = str(num_vios)+' violations found.'
 
-    if output == None:
-        filename = 'output.csv'
-    elif output != None:
-        filename = output
-
-    utils.write_csv(output_data, filename)
+    if output != None:
+        utils.write_csv(output_data, output)
     print(out_line)
 
 
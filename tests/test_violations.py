@@ -157,6 +157,84 @@ def test_get_weather_report():
         data  = (fcn,test[0],'weather',code,repr(expct['code']))
         assert_equals(expct, found,'%s(%s,%s) returned a report with %s, not code=%s' % data)
     
+    # Only reports in the same offset count (the DST change has duplicate instants)
+    tests = [("2017-03-12T03:30:00-04:00","2017-03-12T03:00:00-04:00"),
+             ("2017-03-12T02:30:00-05:00","2017-03-12T02:00:00-05:00")]
+    
+    for test in tests:
+        expct = report[test[1]]
+        stamp = utils.str_to_time(test[0])
+        found = violations.get_weather_report(stamp,report)
+        data  = (fcn,test[0],'weather',repr(expct['code']))
+        assert_equals(expct, found,'%s(%s,%s) did not return the report with code=%s' % data)
+    
+    # No earlier report in the same offset
+    tests = ["2015-01-01T00:00:00-05:00","2017-01-15T10:30:00-04:00","2017-06-01T12:30:00+00:00"]
+    
+    for test in tests:
+        stamp = utils.str_to_time(test)
+        found = violations.get_weather_report(stamp,report)
+        assert_equals(None, found,'%s(%s,%s) returned %s, not None' % (fcn,test,'weather',repr(found)))
+    
+    # An explicit index gives the same answers as no index
+    index = violations.get_weather_index(report)
+    tests = ["2017-10-12T11:00:00-04:00","2017-10-12T11:30:00-04:00","2017-03-12T02:45:00-05:00",
+             "2017-03-12T03:30:00-04:00","2017-12-27T23:00:00-05:00","2015-01-01T00:00:00-05:00",
+             "2017-01-15T10:30:00-04:00"]
+    
+    for test in tests:
+        stamp = utils.str_to_time(test)
+        expct = violations.get_weather_report(stamp,report)
+        found = violations.get_weather_report(stamp,report,index)
+        assert_true(expct is found,
+                    '%s(%s,%s,index) returned a different report than without an index' % (fcn,test,'weather'))
+    
+    print('  %s passed all tests' % fcn)
+
+
+def test_load_weather():
+    """
+    Tests the function load_weather
+    """
+    fcn = 'violations.load_weather'
+    
+    import shutil
+    import tempfile
+    
+    parent = os.path.split(__file__)[0]
+    folder = tempfile.mkdtemp()
+    fpath  = os.path.join(folder,'weather.json')
+    shutil.copyfile(os.path.join(parent,'weather.json'),fpath)
+    
+    try:
+        # An unchanged file is not read again
+        first  = violations.load_weather(fpath)
+        second = violations.load_weather(fpath)
+        assert_equals(utils.read_json(fpath),first[0],
+                      '%s(%s) did not return the contents of the file' % (fcn,repr(fpath)))
+        assert_true(first[0] is second[0] and first[1] is second[1],
+                    '%s(%s) reread a file that did not change' % (fcn,repr(fpath)))
+        
+        # A file with new contents is read again
+        key = '2017-04-21T08:00:00-04:00'
+        file = open(fpath,'w')
+        file.write('{"%s": {"code": "new"}}' % key)
+        file.close()
+        third = violations.load_weather(fpath)
+        assert_equals({key: {'code': 'new'}},third[0],
+                      '%s(%s) did not reload a rewritten file' % (fcn,repr(fpath)))
+        
+        # A file that is only touched is read again
+        stat = os.stat(fpath)
+        os.utime(fpath,ns=(stat.st_atime_ns,stat.st_mtime_ns+10**9))
+        fourth = violations.load_weather(fpath)
+        assert_true(fourth[0] is not third[0],
+                    '%s(%s) did not reload a touched file' % (fcn,repr(fpath)))
+        assert_equals(third[0],fourth[0],
+                      '%s(%s) reloaded a touched file incorrectly' % (fcn,repr(fpath)))
+    finally:
+        shutil.rmtree(folder)
+    
     print('  %s passed all tests' % fcn)
 
 
@@ -293,5 +371,6 @@ def test():
     test_bad_winds()
     test_bad_ceiling()
     test_get_weather_report()
+    test_load_weather()
     test_get_weather_violation()
     test_list_weather_violations()
@@ -35,14 +35,9 @@ def read_csv(filename):
     is a valid CSV file
     """
 
-    file = open(filename)
-    wrapper = csv.reader(file)
+    with open(filename, newline='') as file:
+        table = list(csv.reader(file))
 
-    table = []
-    for row in wrapper:
-        table.append(row)
-
-    file.close()
     return table
 
 
@@ -63,13 +58,8 @@ def write_csv(data,filename):
     .csv or .CSV.  The file may or may not exist.
     """
 
-    file = open(filename,'w')
-    wrapper = csv.writer(file)
-
-    for row in data:
-        wrapper.writerow(row)
-
-    file.close()
+    with open(filename, 'w', newline='', buffering=1<<20) as file:
+        csv.writer(file).writerows(data)
 
 
 def read_json(filename):
@@ -85,11 +75,9 @@ def read_json(filename):
     is a valid JSON file
     """
 
-    file = open(filename)
-    text = file.read()
-    data = json.loads(text)
+    with open(filename) as file:
+        data = json.load(file)
 
-    file.close()
     return data
 
 
@@ -97,9 +85,10 @@ def str_to_time(timestamp,tz=None):
     """
     Returns the datetime object for the given timestamp (or None if stamp is invalid)
 
-    This function should just use the parse function in dateutil.parser to
-    convert the timestamp to a datetime object.  If it is not a valid date (so
-    the parser crashes), this function should return None.
+    This function tries the (fast) ISO format parser in the datetime module first,
+    and uses the parse function in dateutil.parser for any timestamp that is not in
+    ISO format.  If it is not a valid date (so the parser crashes), this function
+    should return None.
 
     If the timestamp has a timezone, then it should keep that timezone even if
     the value for tz is not None.  Otherwise, if timestamp has no timezone and
@@ -120,7 +109,11 @@ def str_to_time(timestamp,tz=None):
     # HINT: Use the code from the previous exercise and update the timezone
     # Use localize if timezone is a string; otherwise replace the timezone if not None
     try:
-        dto = parse(timestamp)
+        #ISO timestamps are by far the most common, and much faster to parse directly
+        try:
+            dto = datetime.datetime.fromisoformat(timestamp)
+        except ValueError:
+            dto = parse(timestamp)
         if dto.tzinfo == None:
             if type(tz) == str:
                 tz = pytz.timezone(tz)
@@ -182,10 +175,15 @@ def daytime(time,daycycle):
         yr = time.strftime('%Y')
         dt = time.strftime('%m-%d')
 
-        settime  = daycycle[yr][dt]["sunset"]
-        settime = parse(settime)
-        risetime = daycycle[yr][dt]["sunrise"]
-        risetime = parse(risetime)
+        setstr   = daycycle[yr][dt]["sunset"]
+        risestr  = daycycle[yr][dt]["sunrise"]
+        #times are normally 'HH:MM', which does not need the general parser
+        try:
+            settime  = datetime.time.fromisoformat(setstr)
+            risetime = datetime.time.fromisoformat(risestr)
+        except ValueError:
+            settime  = parse(setstr)
+            risetime = parse(risestr)
         dctz     = daycycle['timezone']
 
         sunset = datetime.datetime(time.year, time.month, time.day, settime.hour, settime.minute, settime.second, settime.microsecond)
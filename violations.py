@@ -36,6 +36,7 @@ import utils
 import pilots
 import datetime
 import os.path
+import bisect
 
 
 # WEATHER FUNCTIONS
@@ -76,21 +77,12 @@ def bad_visibility(visibility,minimum):
     if visibility == 'unavailable':
         #Bad Record Keeping
         return True
-    elif "minimum" in visibility:
-        if visibility["units"] == "FT":
-            viz = (visibility["minimum"]/5280)
-        elif visibility["units"] == "SM":
-            viz = visibility["minimum"]
-    elif "prevailing" in visibility:
-        if visibility["units"] == "FT":
-            viz = (visibility["prevailing"]/5280)
-        elif visibility["units"] == "SM":
-            viz = visibility["prevailing"]
-
-    if minimum >= viz:
-        return True
-    else:
-        return False
+
+    viz = visibility.get("minimum", visibility.get("prevailing"))
+    if visibility["units"] == "FT":
+        viz = viz/5280
+
+    return minimum > viz
 
 
 def bad_winds(winds,maxwind,maxcross):
@@ -141,21 +133,19 @@ def bad_winds(winds,maxwind,maxcross):
     elif winds == 'unavailable':
         #Bad Record Keeping
         return True
-    elif winds["units"] == "MPS":
-        crozz = (winds["crosswind"]*1.94384)
-        if "gusts" in winds:
-            windz = (winds["gusts"]*1.94384)
-        elif "speed" in winds:
-            windz = (winds["speed"]*1.94384)
-    elif winds["units"] == "KT":
-        crozz = winds["crosswind"]
-        if "gusts" in winds:
-            windz = winds["gusts"]
-        elif "speed" in winds:
-            windz = winds["speed"]
-
-    if windz > maxwind or crozz > maxcross: return True
-    else: return False
+
+    if winds["units"] == "MPS":
+        factor = 1.94384
+    else:
+        factor = 1
+
+    #gusts are always the worse of the two, so they take priority
+    windz = winds.get("gusts", winds["speed"])*factor
+    if windz > maxwind:
+        return True
+
+    crozz = winds.get("crosswind", 0)*factor
+    return crozz > maxcross
 
 
 def bad_ceiling(ceiling,minimum):
@@ -200,50 +190,91 @@ def bad_ceiling(ceiling,minimum):
     Precondition: minimum is a float or int
     """
 
-    comp_ceils = []
-    scattered = []
-    broken = []
-    overcast = []
-    indef_ceil = []
-
     if ceiling == "clear":
         return False
     elif ceiling == 'unavailable':
         #Bad Record Keeping
         return True
-    else:
-        #get 'broken', 'overcast', and 'indefinite ceiling'.
-        for x in range(len(ceiling)):
-            if ceiling[x]["type"] == "scattered":
-                scattered.append(ceiling[x]["height"])
-        for x in range(len(ceiling)):
-            if ceiling[x]["type"] == "broken":
-                broken.append(ceiling[x]["height"])
-        for x in range(len(ceiling)):
-            if ceiling[x]["type"] == "overcast":
-                overcast.append(ceiling[x]["height"])
-        for x in range(len(ceiling)):
-            if ceiling[x]["type"] == "indefinite ceiling":
-                indef_ceil.append(ceiling[x]["height"])
-
-    if len(scattered) != 0:
-        scattered = min(scattered)
-
-    if len(broken) != 0:
-        comp_ceils.append(min(broken))
-    if len(overcast) != 0:
-        comp_ceils.append(min(overcast))
-    if len(indef_ceil) != 0:
-        comp_ceils.append(min(indef_ceil))
-
-    if len(comp_ceils) == 0 and scattered != None:
-            return False
-    elif len(comp_ceils) > 0:
-        ceil = min(comp_ceils)
-        return minimum > ceil
-
-
-def get_weather_report(takeoff,weather):
+
+    #lowest 'broken', 'overcast', or 'indefinite ceiling' layer, in one pass
+    lowest = None
+    for layer in ceiling:
+        if layer["type"] in ("broken", "overcast", "indefinite ceiling"):
+            height = layer["height"]
+            if lowest == None or height < lowest:
+                lowest = height
+
+    if lowest == None:
+        return False
+    return minimum > lowest
+
+
+def get_weather_index(weather):
+    """
+    Returns a search index for the timestamps of the weather dictionary.
+
+    The index is a dictionary whose keys are UTC offsets (as timedelta objects).  The
+    value for each offset is a tuple of two lists of the same length.  The first list
+    contains the weather keys with that offset, converted to datetime objects and sorted
+    from earliest to latest.  The second list contains the matching weather reports in
+    the same order, so a position found in the first list is the report itself.
+
+    Reports are grouped by offset because get_weather_report only compares a takeoff
+    against reports in the same timezone offset. Building the index parses every key
+    exactly once, so it should be built once and then shared by all calls to
+    get_weather_report.
+
+    Parameter weather: The weather report dictionary
+    Precondition: weather is a dictionary formatted as described in get_weather_report
+    """
+    groups = {}
+    for key in weather:
+        key_dto = utils.str_to_time(key)
+        groups.setdefault(key_dto.utcoffset(),[]).append((key_dto,key))
+
+    index = {}
+    for offset in groups:
+        pairs = sorted(groups[offset])
+        times   = [pair[0] for pair in pairs]
+        reports = [weather[pair[1]] for pair in pairs]
+        index[offset] = (times,reports)
+    return index
+
+
+# The most recently loaded weather file, as (file signature, weather, index)
+LAST_LOADED = (None, None, None)
+
+
+def load_weather(filename):
+    """
+    Returns the weather dictionary stored in filename, together with its search index.
+
+    The result is a tuple of the weather dictionary and get_weather_index() of that
+    dictionary.  Reading weather.json and indexing it is the most expensive part of
+    loading a dataset, so this function remembers the last file it loaded.  If it is
+    called again with the same file, and that file has the same modification time and
+    size, it returns the previous dictionary and index instead of reading the file again.
+    Any change to the file (a new modification time or size) causes it to be reloaded.
+
+    Because the same dictionary is handed to every caller that loads an unchanged file,
+    and the index is only built once, callers must treat the returned dictionary as
+    read-only.  A caller that needs to change the weather should copy it first (and
+    build its own index with get_weather_index).
+
+    Parameter filename: The weather file to read
+    Precondition: filename is a string, referring to a file that exists, and that file
+    is a valid JSON file containing a weather dictionary
+    """
+    global LAST_LOADED
+    stat = os.stat(filename)
+    signature = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+    if LAST_LOADED[0] != signature:
+        weather = utils.read_json(filename)
+        LAST_LOADED = (signature, weather, get_weather_index(weather))
+    return (LAST_LOADED[1], LAST_LOADED[2])
+
+
+def get_weather_report(takeoff,weather,index=None):
     """
     Returns the most recent weather report at or before take-off.
 
@@ -315,6 +346,16 @@ def get_weather_report(takeoff,weather):
 
     Paramater weather: The weather report dictionary
     Precondition: weather is a dictionary formatted as described above
+
+    If index is None, this function builds a new index from weather when the takeoff
+    has no exact match, which means parsing every key.  Callers that look up many
+    takeoffs should build the index once with get_weather_index and pass it in.  An
+    index only reflects weather as it was when the index was built, so it must be
+    rebuilt if weather is modified.
+
+    Parameter index: The search index for weather (OPTIONAL)
+    Precondition: index is None or the result of get_weather_index(weather), built
+    after the last change to weather
     """
     # HINT: Looping through the dictionary is VERY slow because it is so large
     # You should convert the takeoff time to an ISO string and search for that first.
@@ -327,23 +368,21 @@ def get_weather_report(takeoff,weather):
     #convert takeoff dto to an ISO string
     iso_takeoff = takeoff.isoformat()
     #search weather dict for that string
-    try:
-        weather_report = weather[iso_takeoff]
+    weather_report = weather.get(iso_takeoff)
+    if weather_report != None:
         return weather_report
-    except:
-        before_keys = []
-        for key in weather:
-            key_dto = utils.str_to_time(key)
-            if takeoff.tzinfo == key_dto.tzinfo and takeoff > key_dto:
-                before_keys.append(key)
-
 
-        best_key = max(before_keys)
+    if index == None:
+        index = get_weather_index(weather)
+    if not takeoff.utcoffset() in index:
+        return None
+    times, reports = index[takeoff.utcoffset()]
 
-        if len(best_key) != 0:
-            return weather[best_key]
-        elif len(best_key) == 0:
-            return None
+    #binary search for the last report at or before takeoff
+    pos = bisect.bisect_right(times, takeoff) - 1
+    if pos < 0:
+        return None
+    return reports[pos]
 
 
 def get_weather_violation(weather,minimums):
@@ -405,37 +444,49 @@ def get_weather_violation(weather,minimums):
     Precondition: minimums is a list of four floats
     """
 
-    b_v = None
-    b_w = None
-    b_c = None
-
     if weather == None:
         return 'Unknown'
 
-    if bad_visibility(weather['visibility'], minimums[1]) == True:
-        b_v = 'Visibility'
+    vis, wind, sky = weather['visibility'], weather['wind'], weather['sky']
+
+    reason = ''
+    if bad_visibility(vis, minimums[1]):
+        reason = 'Visibility'
+
+    if bad_winds(wind, minimums[2], minimums[3]):
+        if reason != '':
+            return 'Weather'
+        reason = 'Winds'
 
-    if bad_winds(weather['wind'], minimums[2], minimums[3]) == True:
-        b_w = 'Winds'
+    if bad_ceiling(sky, minimums[0]):
+        if reason != '':
+            return 'Weather'
+        reason = 'Ceiling'
 
-    if bad_ceiling(weather['sky'], minimums[0]) == True:
-        b_c = 'Ceiling'
+    return reason
 
-    baddies = []
 
-    if b_v != None:
-        baddies.append(b_v)
-    if b_w != None:
-        baddies.append(b_w)
-    if b_c != None:
-        baddies.append(b_c)
+def is_date_only(stamps):
+    """
+    Returns True if every timestamp in stamps is a plain date, False otherwise.
+
+    A plain date is a timestamp at midnight (e.g. '2015-01-07').  Empty strings are
+    ignored, as they are missing milestones.  If any timestamp has a time of day (or
+    cannot be parsed), this function returns False.
 
-    if len(baddies) == 0:
-        return ''
-    elif len(baddies) == 1:
-        return baddies[0]
-    elif len(baddies) > 1:
-        return 'Weather'
+    If all of a student's milestones are plain dates, then the certification from
+    pilots.get_certification can only change at midnight.  So it is the same for
+    every takeoff on the same day, except one exactly at midnight.
+
+    Parameter stamps: The timestamps to check
+    Precondition: stamps is a list of strings
+    """
+    for stamp in stamps:
+        if stamp != '':
+            dto = utils.str_to_time(stamp)
+            if dto == None or dto.time() != datetime.time():
+                return False
+    return True
 
 
 # FILES TO AUDIT
@@ -498,7 +549,7 @@ def list_weather_violations(directory):
 
     #WEATHER = 'weather.json'
     #weather_path  = os.path.join(parent, directory, WEATHER)
-    weather = utils.read_json(os.path.join(directory, WEATHER))
+    weather, weather_index = load_weather(os.path.join(directory, WEATHER))
 
     #MINIMUMS - 'maximums.csv'
     #minimums_path  = os.path.join(parent, directory, MINIMUMS)
@@ -507,6 +558,15 @@ def list_weather_violations(directory):
     #STUDNENTS - 'students.csv'
     #students_path  = os.path.join(parent, directory, STUDENTS)
     students = utils.read_csv(os.path.join(directory, STUDENTS))
+    #index by ID once; the first row with an ID wins, as in utils.get_for_id
+    student_index = {}
+    #students whose milestones are all plain dates (no time of day)
+    date_only = set()
+    for row in students[1:]:
+        if not row[0] in student_index:
+            student_index[row[0]] = row
+            if is_date_only(row[3:]):
+                date_only.add(row[0])
 
     #LESSONS - 'lessons.csv in KITH-2017'
     #lessons_path  = os.path.join(parent, directory, LESSONS)
@@ -520,24 +580,46 @@ def list_weather_violations(directory):
         # Get the weather conditions
         # Check for a violation and add to result if so
 
+    #lessons are booked in shared time slots, so resolve each slot only once:
+    #the takeoff time, whether it is daytime, and the weather report
+    slots = {}
+    for line in lessons:
+        if not line[3] in slots:
+            takeoff = utils.str_to_time(line[3])
+            daytime = utils.daytime(takeoff, daycycle)
+            report  = get_weather_report(takeoff, weather, weather_index)
+            slots[line[3]] = (takeoff, daytime, report)
+
+    #only a handful of distinct flight categories, so each is resolved once
+    #(vfr picks the VMC or IMC rows of the table)
+    minimums_index = {}
+    #for date-only students, a certification can only change at midnight
+    certs = {}
+    #reports and minimums are shared objects, so a violation is cached per pair
+    verdicts = {}
+
     results = []
-    for x in range(len(lessons)):
-        line = lessons[x]
-        takeoff = utils.str_to_time(lessons[x][3])
-        cert = pilots.get_certification(takeoff, utils.get_for_id(lessons[x][0], students))
-        if lessons[x][2] == '':
-            instructed = False
-        elif lessons[x][2] != '':
-            instructed = True
-        if lessons[x][5] == 'VFR':
-            vfr = True
-        elif lessons[x][5] == 'IFR':
-            vfr = False
-        pilot_minimums = pilots.get_minimums(cert, lessons[x][6], instructed, vfr, utils.daytime(takeoff, daycycle), minimums)
-        weather_conditions = get_weather_report(takeoff, weather)
-        viola = get_weather_violation(weather_conditions, pilot_minimums)
+    for line in lessons:
+        takeoff, daytime, weather_conditions = slots[line[3]]
+        if line[0] in date_only:
+            #a takeoff exactly at midnight is not yet past that day's milestone
+            key = (line[0], takeoff.date(), takeoff.time() == datetime.time())
+        else:
+            key = (line[0], takeoff)
+        if not key in certs:
+            certs[key] = pilots.get_certification(takeoff, student_index.get(line[0]))
+        cert = certs[key]
+        instructed = line[2] != ''
+        vfr = line[5] == 'VFR'
+        category = (cert, line[6], instructed, vfr, daytime)
+        if not category in minimums_index:
+            minimums_index[category] = pilots.get_minimums(*category, minimums)
+        pilot_minimums = minimums_index[category]
+        key = (id(weather_conditions), id(pilot_minimums))
+        if not key in verdicts:
+            verdicts[key] = get_weather_violation(weather_conditions, pilot_minimums)
+        viola = verdicts[key]
         if viola != '':
-            line.append(viola)
-            results.append(line)
+            results.append(line+[viola])
 
     return results